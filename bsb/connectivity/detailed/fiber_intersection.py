@@ -58,8 +58,6 @@ class FiberIntersection(Intersectional, ConnectionStrategy):
     def connect(self):
         scaffold = self.scaffold
 
-        p = index.Property(dimension=3)
-        to_cell_tree = index.Index(properties=p)
         labels_pre = None if self.label_pre is None else [self.label_pre]
         labels_post = None if self.label_post is None else [self.label_post]
 
@@ -82,15 +80,38 @@ class FiberIntersection(Intersectional, ConnectionStrategy):
 
         # For every postsynaptic cell, derive the box incorporating all voxels,
         # and store that box in the tree, to later find intersections with that cell.
-        for i, (to_cell, morphology) in enumerate(to_morphology_set):
+        # Keep the cells and their voxel clouds around, under the same index as their
+        # box in the tree, so that hits don't have to be looked up in the morphology set.
+        to_cells = []
+        to_clouds = []
+        to_maps = []
+        to_positions = []
+        to_boxes = []
+        for to_cell, morphology in to_morphology_set:
             self.assert_voxelization(morphology, to_compartments)
-            to_offset = np.concatenate((to_cell.position, to_cell.position))
-            to_box = morphology.cloud.get_voxel_box()
-            to_cell_tree.insert(i, tuple(to_box + to_offset))
+            to_cells.append(to_cell)
+            to_clouds.append(morphology.cloud)
+            to_maps.append(morphology.cloud.map)
+            to_positions.append(to_cell.position)
+            to_boxes.append(morphology.cloud.get_voxel_box())
+        # Offset all the boxes by their cell position at once, as an (N, 6) array.
+        to_positions = np.array(to_positions, dtype=float).reshape(-1, 3)
+        to_boxes = np.array(to_boxes, dtype=float).reshape(-1, 6)
+        to_boxes += np.tile(to_positions, 2)
+        # Bulk load the tree from a stream of boxes: much faster than inserting them one
+        # by one, and the packed tree has less overlap, which speeds up the queries.
+        p = index.Property(dimension=3)
+        if len(to_boxes):
+            to_cell_tree = index.Index(
+                ((i, tuple(box), None) for i, box in enumerate(to_boxes)), properties=p
+            )
+        else:
+            to_cell_tree = index.Index(properties=p)
 
-        connections_out = []
-        compartments_out = []
-        morphologies_out = []
+        # Output buffers, grown when full, and the amount of rows filled in.
+        connections_out = np.empty((len(from_morphology_set), 2), dtype=np.int64)
+        compartments_out = np.empty_like(connections_out)
+        n_out = 0
 
         fig = None
         fiber_cut_num = 0
@@ -140,7 +161,7 @@ class FiberIntersection(Intersectional, ConnectionStrategy):
             from_voxel_tree = index.Index(properties=p)
             from_map = []
             (
-                from_bounding_box,
+                _,
                 from_voxel_tree,
                 from_map,
                 voxel_list,
@@ -151,6 +172,11 @@ class FiberIntersection(Intersectional, ConnectionStrategy):
                 from_voxel_tree,
                 from_map,
             )
+            if not from_map:
+                continue
+            # The bounding box of the fiber is the extent of all of its voxels, which
+            # the tree computes for us: `(min_x, min_y, min_z, max_x, max_y, max_z)`
+            from_bounding_box = tuple(from_voxel_tree.bounds)
 
             # (6) Check for intersections of the postsyn tree with the bounding box
 
@@ -159,30 +185,28 @@ class FiberIntersection(Intersectional, ConnectionStrategy):
             # Bounding box intersection to identify possible connected candidates, using
             # the bounding box of the point cloud. Query the Rtree for intersections of
             # to_cell boxes with our from_cell box
-            cell_intersections = list(
-                to_cell_tree.intersection(
-                    tuple(np.concatenate(from_bounding_box)), objects=False
-                )
+            cell_intersections = np.fromiter(
+                to_cell_tree.intersection(from_bounding_box, objects=False),
+                dtype=np.intp,
             )
+            # Same as in VoxelIntersection, only select a fraction of the total possible
+            # matches, based on how much affinity there is between the cell types.
+            keep = np.random.rand(len(cell_intersections)) < self.affinity
+            cell_intersections = cell_intersections[keep]
 
             # (7) For each hit on the box intersection between pre- and postsynaptic
             # cells, perform voxel cloud intersection to identify actually connected cell
             # pairs and select compartments from their intersecting voxels to form
             # connections with.
             for partner in cell_intersections:
-                # Same as in VoxelIntersection, only select a fraction of the total
-                # possible matches, based on how much affinity there is between the cell
-                # types.
-                if np.random.rand() >= self.affinity:
-                    continue
-                # Get the precise morphology of the to_cell we collided with
-                to_cell, to_morpho = to_morphology_set[partner]
+                # Get the to_cell we collided with
+                to_cell = to_cells[partner]
                 # Get the map from voxel id to list of compartments in that voxel.
-                to_map = to_morpho.cloud.map
+                to_map = to_maps[partner]
                 # Find which voxels inside the bounding box of the fiber and the cell box
                 # actually intersect with eachother.
                 voxel_intersections = self.intersect_voxel_tree(
-                    from_voxel_tree, to_morpho.cloud, to_cell.position
+                    from_voxel_tree, to_clouds[partner], to_positions[partner]
                 )
                 # Returns a list of lists: the elements in the inner lists are the indices
                 # of the voxels in the from point cloud, the indices of the lists inside
@@ -193,8 +217,10 @@ class FiberIntersection(Intersectional, ConnectionStrategy):
                 if not len(intersecting_to_voxels):
                     # No intersections found? Do nothing, continue to next partner.
                     continue
-                # Dictionary that stores the target compartments for each to_voxel.
-                target_comps_per_to_voxel = {}
+                # Parallel lists of the intersecting to_voxels and their target
+                # compartments.
+                to_voxel_ids = []
+                target_compartments_list = []
 
                 # Iterate over each to_voxel index.
                 for to_voxel_id in intersecting_to_voxels:
@@ -205,35 +231,42 @@ class FiberIntersection(Intersectional, ConnectionStrategy):
                     for from_voxel_id in intersecting_voxels:
                         # Store all of the compartments in the from_voxel as
                         # possible candidates for these cells' connections
-                        target_compartments.extend([from_map[from_voxel_id]])
-                    target_comps_per_to_voxel[to_voxel_id] = target_compartments
+                        target_compartments.append(from_map[from_voxel_id])
+                    to_voxel_ids.append(to_voxel_id)
+                    target_compartments_list.append(target_compartments)
                 # Weigh the random sampling by the amount of compartments so
                 # that voxels with more compartments have a higher chance of
                 # having one of their many compartments randomly picked.
-                voxel_weights = [
-                    len(to_map[to_voxel_id]) * len(from_targets)
-                    for to_voxel_id, from_targets in target_comps_per_to_voxel.items()
-                ]
-                weight_sum = sum(voxel_weights)
-                voxel_weights = [w / weight_sum for w in voxel_weights]
+                # The weights don't need to be normalized for `_draw_categorical`.
+                voxel_weights = np.fromiter(
+                    (
+                        len(to_map[to_voxel_id]) * len(from_targets)
+                        for to_voxel_id, from_targets in zip(
+                            to_voxel_ids, target_compartments_list
+                        )
+                    ),
+                    dtype=np.int64,
+                    count=len(to_voxel_ids),
+                )
                 contacts = round(self.contacts.sample())
-                # Pick a random voxel and its targets
-                candidates = list(target_comps_per_to_voxel.items())
-                while contacts > 0:
-                    contacts -= 1
-                    # Pick a random voxel and its targets
-                    random_candidate_id = np.random.choice(
-                        range(len(candidates)), 1, p=voxel_weights
-                    )[0]
-                    # Pick a to_voxel_id and its target compartments from the list of candidates
-                    random_to_voxel_id, random_compartments = candidates[
-                        random_candidate_id
-                    ]
+                # Pick a random voxel and its targets for each contact, all at once.
+                picks = _draw_categorical(voxel_weights, max(contacts, 0))
+                if n_out + len(picks) > len(connections_out):
+                    connections_out = _grow(connections_out, n_out + len(picks))
+                    compartments_out = _grow(compartments_out, n_out + len(picks))
+                for random_candidate_id in picks:
+                    # Pick a to_voxel_id and its target compartments from the candidates
+                    random_to_voxel_id = to_voxel_ids[random_candidate_id]
+                    random_compartments = target_compartments_list[random_candidate_id]
                     # Pick a random from and to compartment of the chosen voxel pair
-                    from_compartment = np.random.choice(random_compartments, 1)[0]
-                    to_compartment = np.random.choice(to_map[random_to_voxel_id], 1)[0]
-                    compartments_out.append([from_compartment.id, to_compartment])
-                    connections_out.append([from_cell.id, to_cell.id])
+                    to_targets = to_map[random_to_voxel_id]
+                    from_compartment = random_compartments[
+                        np.random.randint(len(random_compartments))
+                    ]
+                    to_compartment = to_targets[np.random.randint(len(to_targets))]
+                    compartments_out[n_out] = from_compartment.id, to_compartment
+                    connections_out[n_out] = from_cell.id, to_cell.id
+                    n_out += 1
 
         # Throw warning on cut fibers:
         if fiber_cut_num > 0:
@@ -245,8 +278,8 @@ class FiberIntersection(Intersectional, ConnectionStrategy):
             )
         self.scaffold.connect_cells(
             self,
-            np.array(connections_out or np.empty((0, 2))),
-            compartments=np.array(compartments_out or np.empty((0, 2))),
+            connections_out[:n_out],
+            compartments=compartments_out[:n_out],
         )
 
     def intersect_voxel_tree(self, from_voxel_tree, to_cloud, to_pos):
@@ -262,17 +295,24 @@ class FiberIntersection(Intersectional, ConnectionStrategy):
         :type to_pos: list
         """
 
-        voxel_intersections = []
-
+        # Compute the absolute boxes of all the voxels in one go, as an (N, 6) array.
+        voxels = np.asarray(to_cloud.get_voxels(cache=True), dtype=float).reshape(-1, 3)
+        abs_pos = voxels + np.asarray(to_pos)
+        abs_box = abs_pos + np.asarray(to_cloud.grid_size)
+        boxes = np.concatenate((abs_pos, abs_box), axis=1)
         # Find intersection of to_cloud with from_voxel_tree
-        for v, voxel in enumerate(to_cloud.get_voxels(cache=True)):
-            absolute_position = np.add(voxel, to_pos)
-            absolute_box = np.add(absolute_position, to_cloud.grid_size)
-            box = np.concatenate((absolute_position, absolute_box))
-            voxel_intersections.append(
-                list(from_voxel_tree.intersection(tuple(box), objects=False))
+        if not len(boxes):
+            return []
+        if hasattr(from_voxel_tree, "intersection_v"):
+            # Rtree 1.0+ can query all boxes in a single call, returning the
+            # concatenated ids and the amount of ids per box.
+            ids, counts = from_voxel_tree.intersection_v(
+                np.ascontiguousarray(boxes[:, :3]), np.ascontiguousarray(boxes[:, 3:])
             )
-        return voxel_intersections
+            splits = np.cumsum(counts.astype(int))[:-1]
+            return [hits.tolist() for hits in np.split(ids, splits)]
+        intersection = from_voxel_tree.intersection
+        return [list(intersection(tuple(box), objects=False)) for box in boxes]
 
     def assert_voxelization(self, morphology, compartment_types):
         if len(morphology.cloud.get_voxels()) == 0:
@@ -283,9 +323,11 @@ class FiberIntersection(Intersectional, ConnectionStrategy):
             )
 
     def interpolate_branches(self, branches):
-        for branch in branches:
+        stack = list(reversed(branches))
+        while stack:
+            branch = stack.pop()
             branch.interpolate(self.resolution)
-            self.interpolate_branches(branch.child_branches)
+            stack.extend(reversed(branch.child_branches))
 
     def voxelize_branches(
         self,
@@ -294,20 +336,45 @@ class FiberIntersection(Intersectional, ConnectionStrategy):
         bounding_box=None,
         voxel_tree=None,
         map=None,
-        voxel_list=None,
     ):
         voxel_list = []
-        for branch in branches:
+        # Depth-first, in the same order as a recursive traversal would visit them, so
+        # that the voxel ids in the tree and the map stay in the same order.
+        stack = list(reversed(branches))
+        while stack:
+            branch = stack.pop()
             bounding_box, voxel_tree, map, voxel_list = branch.voxelize(
                 position, bounding_box, voxel_tree, map, voxel_list
             )
-            self.voxelize_branches(
-                branch.child_branches, position, bounding_box, voxel_tree, map, voxel_list
-            )
+            stack.extend(reversed(branch.child_branches))
 
         return bounding_box, voxel_tree, map, voxel_list
 
 
+def _draw_categorical(weights, n):
+    """
+    Draw ``n`` indices from the categorical distribution of the given ``weights``, by
+    inverse transform sampling on their cumulative sum. The weights don't need to be
+    normalized, but can't all be zero.
+    """
+    cdf = np.cumsum(weights)
+    if not n:
+        return np.empty(0, dtype=int)
+    if not len(cdf) or cdf[-1] <= 0:
+        raise ValueError("Can't draw from categories that all have zero weight.")
+    return np.searchsorted(cdf, np.random.random(n) * cdf[-1], side="right")
+
+
+def _grow(buffer, size):
+    """
+    Return a copy of ``buffer`` with room for at least ``size`` rows, doubling its
+    length to amortize future growth.
+    """
+    grown = np.empty((max(2 * len(buffer), size), *buffer.shape[1:]), dtype=buffer.dtype)
+    grown[: len(buffer)] = buffer
+    return grown
+
+
 class QuiverTransform(FiberTransform):
     """
     QuiverTransform applies transformation to a FiberMorphology, based on an orientation field in a voxelized volume.
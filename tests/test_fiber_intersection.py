@@ -4,6 +4,12 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 sys.path.insert(0, os.path.join(os.path.dirname(__file__)))
 from bsb.core import Scaffold
 from bsb.config import from_json
+from bsb.connectivity.detailed.fiber_intersection import (
+    FiberIntersection,
+    _draw_categorical,
+    _grow,
+)
+from rtree import index
 
 
 def relative_to_tests_folder(path):
@@ -82,5 +88,108 @@ class TestFiberIntersection(unittest.TestCase):
         self.assertTrue(len(cs_transform.connections) <= num_conn)
 
 
+class _Cloud:
+    def __init__(self, voxels, grid_size):
+        self._voxels = voxels
+        self.grid_size = grid_size
+
+    def get_voxels(self, cache=False):
+        return self._voxels
+
+
+class _PerBoxTree:
+    # Hides `intersection_v` from the tree, to force the per box query path.
+    def __init__(self, tree):
+        self.intersection = tree.intersection
+
+
+def _sorted_hits(voxel_intersections):
+    return [sorted(hits) for hits in voxel_intersections]
+
+
+class TestIntersectVoxelTree(unittest.TestCase):
+    def setUp(self):
+        self.strat = FiberIntersection(
+            strategy="bsb.connectivity.FiberIntersection",
+            presynaptic=dict(cell_types=[]),
+            postsynaptic=dict(cell_types=[]),
+        )
+        boxes = ((i, (i, i, i, i + 0.5, i + 0.5, i + 0.5), None) for i in range(4))
+        self.tree = index.Index(boxes, properties=index.Property(dimension=3))
+        self.cloud = _Cloud([[0, 0, 0], [5, 5, 5], [1, 1, 1]], [1, 1, 1])
+
+    def test_per_box(self):
+        hits = self.strat.intersect_voxel_tree(
+            _PerBoxTree(self.tree), self.cloud, [0, 0, 0]
+        )
+        self.assertEqual([[0, 1], [], [1, 2]], _sorted_hits(hits))
+
+    def test_batched(self):
+        if not hasattr(self.tree, "intersection_v"):
+            self.skipTest("Bulk queries require rtree 1.0+")
+        for pos in ([0, 0, 0], [1, 1, 1], [-0.5, -0.5, -0.5]):
+            with self.subTest(pos=pos):
+                batched = self.strat.intersect_voxel_tree(self.tree, self.cloud, pos)
+                per_box = self.strat.intersect_voxel_tree(
+                    _PerBoxTree(self.tree), self.cloud, pos
+                )
+                self.assertEqual(len(self.cloud.get_voxels()), len(batched))
+                self.assertEqual(_sorted_hits(per_box), _sorted_hits(batched))
+        hits = self.strat.intersect_voxel_tree(self.tree, self.cloud, [0, 0, 0])
+        self.assertEqual([[0, 1], [], [1, 2]], _sorted_hits(hits))
+
+    def test_empty_cloud(self):
+        cloud = _Cloud([], [1, 1, 1])
+        for tree in (self.tree, _PerBoxTree(self.tree)):
+            with self.subTest(tree=tree):
+                self.assertEqual(
+                    [], self.strat.intersect_voxel_tree(tree, cloud, [0, 0, 0])
+                )
+
+
+class TestDrawCategorical(unittest.TestCase):
+    def test_no_draws(self):
+        self.assertEqual(0, len(_draw_categorical([1, 2, 3], 0)))
+        self.assertEqual(0, len(_draw_categorical([0, 0], 0)))
+
+    def test_zero_weights(self):
+        np.random.seed(42)
+        picks = _draw_categorical([0, 1, 0, 0, 3, 0], 10000)
+        self.assertEqual({1, 4}, set(picks), "zero weight categories drawn")
+
+    def test_frequencies(self):
+        np.random.seed(42)
+        weights = np.array([1, 2, 7])
+        picks = _draw_categorical(weights, 100000)
+        freqs = np.bincount(picks, minlength=len(weights)) / len(picks)
+        for freq, p in zip(freqs, weights / weights.sum()):
+            self.assertAlmostEqual(p, freq, delta=0.01)
+
+    def test_all_zero(self):
+        with self.assertRaises(ValueError):
+            _draw_categorical([0, 0, 0], 1)
+        with self.assertRaises(ValueError):
+            _draw_categorical([], 1)
+
+
+class TestGrow(unittest.TestCase):
+    def test_keeps_rows(self):
+        buffer = np.arange(8, dtype=np.int64).reshape(4, 2)
+        grown = _grow(buffer, 5)
+        self.assertEqual(np.int64, grown.dtype)
+        self.assertEqual((8, 2), grown.shape, "should double")
+        self.assertTrue(np.array_equal(buffer, grown[:4]), "rows lost")
+
+    def test_min_size(self):
+        buffer = np.zeros((2, 2), dtype=np.int64)
+        self.assertEqual((11, 2), _grow(buffer, 11).shape)
+
+    def test_empty(self):
+        buffer = np.empty((0, 2), dtype=np.int64)
+        grown = _grow(buffer, 3)
+        self.assertEqual((3, 2), grown.shape)
+        self.assertEqual((0, 2), _grow(buffer, 0).shape)
+
+
 class TestBranching(unittest.TestCase):
     pass